@@ -1,18 +1,34 @@
 import base64
 import re
 import time
-from difflib import SequenceMatcher
-from typing import List, Dict, Any
+from collections.abc import Hashable
+from concurrent.futures import Future
+from typing import List, Dict, Any, Set
 
+import ahocorasick
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
+from rapidfuzz import fuzz
 
-from cv_utils import VideoProcessor
+from frame_workers import FrameWorkerPool
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, shared by REST responses and socket emits."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 
 def create_app() -> Flask:
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.config["SECRET_KEY"] = "interview-coach-secret"
     CORS(app, resources={r"/*": {"origins": "*"}})
     return app
@@ -23,10 +39,22 @@ socketio = SocketIO(
     app,
     cors_allowed_origins="*",
     async_mode="eventlet",
+    json=app.json,
     ping_interval=25,
     ping_timeout=120,
 )
-video_processor = VideoProcessor()
+frame_workers = FrameWorkerPool()
+# Sockets with a frame currently being processed, and per-socket counts of
+# frames dropped because one was already in flight.
+frames_in_flight: Set[str] = set()
+dropped_frames: Dict[str, int] = {}
+# Upper bound on one frame. A worker that overruns it is killed and replaced,
+# so a hang costs its sessions their tracking state, not every later frame.
+# A fresh worker also pays for process start-up, imports and the first JIT
+# compile, so it gets the longer allowance.
+FRAME_TIMEOUT = 15.0
+WORKER_START_TIMEOUT = 120.0
+FRAME_POLL_INTERVAL = 0.005
 
 
 def _load_questions() -> List[Dict[str, Any]]:
@@ -78,7 +106,25 @@ def _load_questions() -> List[Dict[str, Any]]:
     ]
 
 
+def _build_matcher(question: Dict[str, Any]) -> Dict[str, Any]:
+    # Lowercased copies used by evaluate_transcript, computed once per question,
+    # plus an Aho-Corasick automaton that finds every keyword in a single pass.
+    keywords_lower = tuple(k.lower() for k in question["keywords"])
+    automaton = ahocorasick.Automaton()
+    for k_lower in keywords_lower:
+        if k_lower:
+            automaton.add_word(k_lower, k_lower)
+    automaton.make_automaton()
+    return {
+        "keywords_lower": keywords_lower,
+        "automaton": automaton,
+        "sample_lower": question.get("sample_answer", "").lower(),
+    }
+
+
 QUESTIONS = _load_questions()
+QUESTIONS_BY_ID: Dict[int, Dict[str, Any]] = {q["id"]: q for q in QUESTIONS}
+QUESTION_MATCHERS = {q["id"]: _build_matcher(q) for q in QUESTIONS}
 QUESTION_COUNTER = max(q["id"] for q in QUESTIONS)
 
 
@@ -88,8 +134,24 @@ def _next_question_id() -> int:
     return QUESTION_COUNTER
 
 
+# ASCII word matching skips the Unicode property lookups for \w; transcripts
+# come from English speech recognition.
+_TOKEN_RE = re.compile(r"\b\w+\b", re.ASCII)
+
+
 def _tokenize(text: str) -> List[str]:
-    return re.findall(r"\b\w+\b", text.lower())
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _wait_for(future: Future, timeout: float) -> Any:
+    # Poll from the greenlet rather than block an OS thread in future.result():
+    # eventlet's tpool has ~20 threads, which would cap concurrent sessions.
+    deadline = time.monotonic() + timeout
+    while not future.done():
+        if time.monotonic() >= deadline:
+            raise TimeoutError
+        socketio.sleep(FRAME_POLL_INTERVAL)
+    return future.result()
 
 
 @socketio.on("connect")
@@ -105,30 +167,52 @@ def handle_connect():
 
 @socketio.on("disconnect")
 def handle_disconnect():
-    video_processor.reset_state()
+    frames_in_flight.discard(request.sid)
+    dropped_frames.pop(request.sid, None)
+    frame_workers.release(request.sid)
 
 
 @socketio.on("video_frame")
 def handle_video_frame(data):
     """
-    Expects payload: {"image": "<base64_data>"}
+    Expects a binary JPEG payload, or the legacy {"image": "<base64_data>"}.
     """
-    if not data or "image" not in data:
+    if isinstance(data, dict):
+        data = data.get("image")
+    if not data:
         emit(
             "analysis",
-            {"error": "Missing base64 image", "timestamp": time.time()},
+            {"error": "Missing image frame", "timestamp": time.time()},
         )
         return
 
+    sid = request.sid
+    if sid in frames_in_flight:
+        # Still working on an earlier frame: drop this one rather than queue it.
+        dropped_frames[sid] = dropped_frames.get(sid, 0) + 1
+        return
+
+    frames_in_flight.add(sid)
     try:
-        metrics = video_processor.process_frame(data["image"])
+        # Inference runs in the session's worker process; the hub keeps
+        # serving other sockets while this greenlet waits.
+        timeout = FRAME_TIMEOUT if frame_workers.is_warm(sid) else WORKER_START_TIMEOUT
+        future = frame_workers.submit(sid, data)
+        metrics = _wait_for(future, timeout)
     except base64.binascii.Error:
         emit("analysis", {"error": "Invalid base64 frame"})
         return
+    except TimeoutError:
+        frame_workers.recycle(future)
+        emit("analysis", {"error": "Frame processing timed out"})
+        return
     except Exception as exc:
         emit("analysis", {"error": f"Processing error: {exc}"})
         return
+    finally:
+        frames_in_flight.discard(sid)
 
+    metrics["dropped_frames"] = dropped_frames.get(sid, 0)
     emit("analysis", metrics)
 
 
@@ -153,13 +237,22 @@ def create_question():
     if not keywords:
         return jsonify({"error": "At least one keyword is required"}), 400
 
+    if not isinstance(keywords, list) or not all(
+        isinstance(k, str) for k in keywords
+    ):
+        return jsonify({"error": "Keywords must be strings"}), 400
+
     question = {
         "id": _next_question_id(),
         "question": text,
         "keywords": keywords,
         "sample_answer": sample,
     }
+    # Build the matcher first so a failure leaves no half-registered question.
+    matcher = _build_matcher(question)
     QUESTIONS.append(question)
+    QUESTIONS_BY_ID[question["id"]] = question
+    QUESTION_MATCHERS[question["id"]] = matcher
     return jsonify({"question": question}), 201
 
 
@@ -169,7 +262,11 @@ def evaluate_transcript():
     transcript = (payload.get("transcript") or "").lower()
     question_id = payload.get("questionId")
 
-    question = next((q for q in QUESTIONS if q["id"] == question_id), None)
+    # Matches any id-equal JSON value (1, 1.0, ...) like the old linear scan;
+    # only unhashable lists/objects are ruled out before the dict lookup.
+    question = (
+        QUESTIONS_BY_ID.get(question_id) if isinstance(question_id, Hashable) else None
+    )
     if not question:
         return jsonify({"error": "Invalid questionId"}), 400
 
@@ -186,11 +283,27 @@ def evaluate_transcript():
             }
         )
 
-    hits = sum(1 for k in keywords if k.lower() in transcript)
+    matcher = QUESTION_MATCHERS[question["id"]]
+    automaton = matcher["automaton"]
+    found = (
+        {k_lower for _, k_lower in automaton.iter(transcript)}
+        if automaton.kind == ahocorasick.AHOCORASICK
+        else set()
+    )
+    # An empty keyword is a substring of everything, as with `in` before.
+    missing = [
+        k
+        for k, k_lower in zip(keywords, matcher["keywords_lower"])
+        if k_lower and k_lower not in found
+    ]
+    hits = len(keywords) - len(missing)
     score = int((hits / len(keywords)) * 100)
 
-    missing = [k for k in keywords if k.lower() not in transcript]
-    sample_similarity = SequenceMatcher(None, transcript, sample_answer.lower()).ratio()
+    # Normalized indel similarity over the optimal (LCS) alignment. This reads
+    # well above difflib.SequenceMatcher.ratio(), whose autojunk heuristic
+    # drops common characters once the sample reaches 200 chars (all built-in
+    # samples do), so sample/novelty scores are on this scale, not difflib's.
+    sample_similarity = fuzz.ratio(transcript, matcher["sample_lower"]) / 100.0
     sample_score = int(sample_similarity * 100)
 
     transcript_tokens = _tokenize(transcript)
@@ -1,24 +1,101 @@
 import base64
+import math
+import os
 from collections import deque
 from dataclasses import dataclass, field
+from itertools import chain
 from typing import Deque, Dict, Optional
 
 import cv2
 import mediapipe as mp
 import numpy as np
 
+from onnx_face_mesh import OnnxFaceMesh
 
-def _decode_base64_frame(data: str) -> np.ndarray:
-    bytes_data = base64.b64decode(data.split(",")[-1])
-    array = np.frombuffer(bytes_data, dtype=np.uint8)
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels below then run as NumPy
+    njit = None
+
+
+def _jit(fn):
+    if njit is None:
+        return fn
+    return njit(cache=True, fastmath=True)(fn)
+
+
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # PyTurboJPEG / libturbojpeg missing
+    _turbo_jpeg = None
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def _decode_frame(data: str | bytes) -> np.ndarray:
+    """Decode a JPEG frame straight to a contiguous RGB array."""
+    # Binary socket payloads arrive as raw JPEG bytes; strings are legacy
+    # base64 data URLs.
+    if isinstance(data, str):
+        data = base64.b64decode(data.split(",")[-1])
+    if _turbo_jpeg is not None:
+        try:
+            return _turbo_jpeg.decode(data, pixel_format=TJPF_RGB)
+        except OSError:
+            pass  # not a JPEG libjpeg-turbo can read; let OpenCV try
+    array = np.frombuffer(data, dtype=np.uint8)
     frame = cv2.imdecode(array, cv2.IMREAD_COLOR)
     if frame is None:
         raise ValueError("Unable to decode frame")
-    return frame
-
-
-def _euclidean_distance(a: np.ndarray, b: np.ndarray) -> float:
-    return float(np.linalg.norm(a - b))
+    # Swap channels in place rather than allocating a second full-size frame.
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+
+
+# One serialized NormalizedLandmark inside a NormalizedLandmarkList: the
+# field-1 tag and length, then tagged little-endian floats x, y and z.
+_LANDMARK_RECORD = np.dtype(
+    [
+        ("tag", "u1"),
+        ("len", "u1"),
+        ("x_tag", "u1"),
+        ("x", "<f4"),
+        ("y_tag", "u1"),
+        ("y", "<f4"),
+        ("z_tag", "u1"),
+        ("z", "<f4"),
+    ]
+)
+_LANDMARK_HEADER_COLS = [0, 1, 2, 7, 12]
+_LANDMARK_HEADER = np.array([0x0A, 15, 0x0D, 0x15, 0x1D], dtype=np.uint8)
+
+
+def _landmarks_to_array(landmark_list, out: np.ndarray) -> np.ndarray:
+    # Parse the serialized message in one structured view rather than reading
+    # three attributes per landmark from Python.
+    n = len(out)
+    buf = landmark_list.SerializeToString()
+    if len(buf) == _LANDMARK_RECORD.itemsize * n:
+        raw = np.frombuffer(buf, dtype=np.uint8).reshape(n, -1)
+        if (raw[:, _LANDMARK_HEADER_COLS] == _LANDMARK_HEADER).all():
+            records = np.frombuffer(buf, dtype=_LANDMARK_RECORD)
+            out[:, 0] = records["x"]
+            out[:, 1] = records["y"]
+            out[:, 2] = records["z"]
+            return out
+    # visibility/presence set (or a coordinate unset): fall back to attributes.
+    out.reshape(-1)[:] = np.fromiter(
+        chain.from_iterable((lm.x, lm.y, lm.z) for lm in landmark_list.landmark),
+        dtype=np.float32,
+        count=out.size,
+    )
+    return out
 
 
 EYE_LANDMARKS = {
@@ -26,6 +103,7 @@ EYE_LANDMARKS = {
     "right": [362, 385, 387, 263, 373, 380],
 }
 IRIS_LANDMARKS = {"left": 468, "right": 473}
+NUM_FACE_LANDMARKS = 478  # 468 mesh points + 10 iris points (refine_landmarks)
 NOSE_TIP = 1
 LEFT_EAR = 234
 RIGHT_EAR = 454
@@ -38,15 +116,127 @@ BROW_LANDMARKS = {
 }
 
 
-def _eye_aspect_ratio(points: np.ndarray) -> float:
-    # points order: [p1, p2, p3, p4, p5, p6]
-    vertical = _euclidean_distance(points[1], points[5]) + _euclidean_distance(
-        points[2], points[4]
-    )
-    horizontal = _euclidean_distance(points[0], points[3])
+# Every landmark pair whose distance feeds a per-frame metric. All of them are
+# computed in one batched norm per frame and looked up by name via _PAIR.
+DISTANCE_PAIRS = {
+    # eye aspect ratio, points order: [p1, p2, p3, p4, p5, p6]
+    "left_eye_v1": (EYE_LANDMARKS["left"][1], EYE_LANDMARKS["left"][5]),
+    "left_eye_v2": (EYE_LANDMARKS["left"][2], EYE_LANDMARKS["left"][4]),
+    "left_eye_h": (EYE_LANDMARKS["left"][0], EYE_LANDMARKS["left"][3]),
+    "right_eye_v1": (EYE_LANDMARKS["right"][1], EYE_LANDMARKS["right"][5]),
+    "right_eye_v2": (EYE_LANDMARKS["right"][2], EYE_LANDMARKS["right"][4]),
+    "right_eye_h": (EYE_LANDMARKS["right"][0], EYE_LANDMARKS["right"][3]),
+    # gaze: iris offset from the outer eye corner
+    "left_iris": (IRIS_LANDMARKS["left"], EYE_LANDMARKS["left"][0]),
+    "right_iris": (IRIS_LANDMARKS["right"], EYE_LANDMARKS["right"][0]),
+    # expression
+    "mouth_width": (MOUTH_LANDMARKS["left"], MOUTH_LANDMARKS["right"]),
+    "mouth_height": (MOUTH_LANDMARKS["top"], MOUTH_LANDMARKS["bottom"]),
+    "inter_ocular": (BROW_LANDMARKS["eye_left"], BROW_LANDMARKS["eye_right"]),
+    "brow_left": (BROW_LANDMARKS["left"], BROW_LANDMARKS["eye_left"]),
+    "brow_right": (BROW_LANDMARKS["right"], BROW_LANDMARKS["eye_right"]),
+}
+_PAIR = {name: i for i, name in enumerate(DISTANCE_PAIRS)}
+_PAIR_IDX_A = np.array([a for a, _ in DISTANCE_PAIRS.values()], dtype=np.intp)
+_PAIR_IDX_B = np.array([b for _, b in DISTANCE_PAIRS.values()], dtype=np.intp)
+
+# Offsets into the distance vector as plain ints, so numba can fold them.
+_D_LEFT_EYE_V1 = _PAIR["left_eye_v1"]
+_D_LEFT_EYE_V2 = _PAIR["left_eye_v2"]
+_D_LEFT_EYE_H = _PAIR["left_eye_h"]
+_D_RIGHT_EYE_V1 = _PAIR["right_eye_v1"]
+_D_RIGHT_EYE_V2 = _PAIR["right_eye_v2"]
+_D_RIGHT_EYE_H = _PAIR["right_eye_h"]
+_D_LEFT_IRIS = _PAIR["left_iris"]
+_D_RIGHT_IRIS = _PAIR["right_iris"]
+_D_MOUTH_WIDTH = _PAIR["mouth_width"]
+_D_MOUTH_HEIGHT = _PAIR["mouth_height"]
+_D_INTER_OCULAR = _PAIR["inter_ocular"]
+_D_BROW_LEFT = _PAIR["brow_left"]
+_D_BROW_RIGHT = _PAIR["brow_right"]
+
+
+# Landmarks are passed around as a (3, N) array: rows x, y and z are each
+# contiguous, so per-axis gathers and the head-pose lookups touch only the
+# coordinates they need.
+
+
+def _pair_distances_numpy(coords, idx_a, idx_b):
+    diff = coords[:, idx_a] - coords[:, idx_b]
+    # einsum fuses the square and the axis sum without a (3, K) temporary.
+    return np.sqrt(np.einsum("ij,ij->j", diff, diff))
+
+
+def _pair_distances_loop(coords, idx_a, idx_b):
+    # numba has no einsum; an explicit loop compiles to the same fused pass.
+    x, y, z = coords[0], coords[1], coords[2]
+    out = np.empty(idx_a.shape[0], dtype=np.float32)
+    for k in range(idx_a.shape[0]):
+        a = idx_a[k]
+        b = idx_b[k]
+        dx = x[a] - x[b]
+        dy = y[a] - y[b]
+        dz = z[a] - z[b]
+        out[k] = math.sqrt(dx * dx + dy * dy + dz * dz)
+    return out
+
+
+_pair_distances = (
+    _pair_distances_numpy if njit is None else _jit(_pair_distances_loop)
+)
+
+
+@_jit
+def _eye_aspect_ratio(vertical_a, vertical_b, horizontal):
     if horizontal == 0:
         return 0.0
-    return vertical / (2.0 * horizontal)
+    return (vertical_a + vertical_b) / (2.0 * horizontal)
+
+
+@_jit
+def _gaze_ratio(iris_offset, horizontal_range):
+    if horizontal_range == 0:
+        return 0.5
+    return iris_offset / horizontal_range
+
+
+@_jit
+def compute_frame_metrics(coords, idx_a, idx_b):
+    """Geometric per-frame metrics from pixel-space landmarks.
+
+    ``coords`` is the (3, N) x/y/z landmark array. Returns ``(ear, pitch, yaw,
+    gaze, smile_ratio, brow_gap, mouth_activity_ratio)``. Compiled with numba
+    when it is installed.
+    """
+    d = _pair_distances(coords, idx_a, idx_b)
+    x, y, z = coords[0], coords[1], coords[2]
+
+    ear_left = _eye_aspect_ratio(d[_D_LEFT_EYE_V1], d[_D_LEFT_EYE_V2], d[_D_LEFT_EYE_H])
+    ear_right = _eye_aspect_ratio(
+        d[_D_RIGHT_EYE_V1], d[_D_RIGHT_EYE_V2], d[_D_RIGHT_EYE_H]
+    )
+    ear = (ear_left + ear_right) / 2.0
+
+    # head pose
+    side_dx = x[RIGHT_EAR] - x[LEFT_EAR]
+    side_dy = y[RIGHT_EAR] - y[LEFT_EAR]
+    yaw = math.degrees(math.atan2(side_dy, side_dx))
+    nose_dy = y[NOSE_TIP] - (y[LEFT_EAR] + y[RIGHT_EAR]) / 2
+    nose_dz = z[NOSE_TIP] - (z[LEFT_EAR] + z[RIGHT_EAR]) / 2
+    pitch = math.degrees(math.atan2(nose_dz, nose_dy))
+
+    left_ratio = _gaze_ratio(d[_D_LEFT_IRIS], d[_D_LEFT_EYE_H])
+    right_ratio = _gaze_ratio(d[_D_RIGHT_IRIS], d[_D_RIGHT_EYE_H])
+    gaze = abs(((left_ratio + right_ratio) / 2) - 0.5)
+
+    mouth_width = d[_D_MOUTH_WIDTH]
+    mouth_height = d[_D_MOUTH_HEIGHT]
+    smile_ratio = mouth_width / max(mouth_height, 1e-6)
+    mouth_activity_ratio = mouth_height / max(mouth_width, 1e-6)
+    brow_gap = (d[_D_BROW_LEFT] + d[_D_BROW_RIGHT]) / (
+        2 * max(d[_D_INTER_OCULAR], 1e-6)
+    )
+    return ear, pitch, yaw, gaze, smile_ratio, brow_gap, mouth_activity_ratio
 
 
 @dataclass
@@ -72,66 +262,115 @@ class VideoProcessor:
     score_decay: float = 1.4
     score_recovery: float = 1.0
     recent_ear: Deque[float] = field(default_factory=lambda: deque(maxlen=12))
+    low_ear_frames: int = 0  # entries of recent_ear below blink_threshold
     consecutive_blink_frames: int = 0
     calm_frames: int = 0
     movement_cooldown: int = 0
     metrics: VideoMetrics = field(default_factory=VideoMetrics)
     last_smile_ratio: float = 0.0
     microexpression_cooldown: int = 0
+    max_input_edge: int = 640
+    # Without the iris refinement pass FaceMesh runs noticeably faster, but
+    # iris centres are then taken as the eye-contour centroid. That depends
+    # only on the eyelids, not the pupil, so gaze stays structurally ~0.5 and
+    # gaze_deviation is effectively disabled.
+    refine_landmarks: bool = field(
+        default_factory=lambda: _env_flag("FACE_MESH_REFINE_LANDMARKS", True)
+    )
+    # ONNX export of the landmark model; when set, inference runs on ONNX
+    # Runtime (CUDA if available) instead of MediaPipe's FaceMesh graph.
+    onnx_model_path: Optional[str] = field(
+        default_factory=lambda: os.environ.get("FACE_MESH_ONNX_MODEL") or None
+    )
+    # ONNX export of the iris model, for a 468-point landmark model; without
+    # it (or a fused 478-point model) gaze is disabled on the ONNX backend.
+    onnx_iris_model_path: Optional[str] = field(
+        default_factory=lambda: os.environ.get("FACE_MESH_ONNX_IRIS_MODEL") or None
+    )
 
     def __post_init__(self):
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            static_image_mode=False,
-            refine_landmarks=True,
-            max_num_faces=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
+        self.face_mesh = None
+        self.onnx_face_mesh = None
+        if self.onnx_model_path:
+            self.onnx_face_mesh = OnnxFaceMesh(
+                self.onnx_model_path, iris_model_path=self.onnx_iris_model_path
+            )
+        else:
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False,
+                refine_landmarks=self.refine_landmarks,
+                max_num_faces=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
+        self._pts_buf = np.empty((NUM_FACE_LANDMARKS, 3), dtype=np.float32)
+        self._coords = np.empty((3, NUM_FACE_LANDMARKS), dtype=np.float32)
+        self._scale_vec: Optional[np.ndarray] = None
+        self._last_hw: Optional[tuple[int, int]] = None
+        # Pay the JIT compilation cost up front rather than on the first frame.
+        compute_frame_metrics(np.zeros_like(self._coords), _PAIR_IDX_A, _PAIR_IDX_B)
 
     def reset_state(self):
         self.metrics = VideoMetrics()
         self.recent_ear.clear()
+        self.low_ear_frames = 0
         self.consecutive_blink_frames = 0
         self.calm_frames = 0
         self.movement_cooldown = 0
         self.last_smile_ratio = 0.0
         self.microexpression_cooldown = 0
-
-    def process_frame(self, base64_frame: str) -> Dict:
-        frame = _decode_base64_frame(base64_frame)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb)
-
-        if not results.multi_face_landmarks:
+        if self.onnx_face_mesh is not None:
+            self.onnx_face_mesh.reset()
+
+    def process_frame(self, frame_data: str | bytes) -> Dict:
+        rgb = _decode_frame(frame_data)
+        h, w, _ = rgb.shape
+        # FaceMesh resizes internally to its own small input, so larger frames
+        # only cost bandwidth. Landmarks are normalized, so scaling them by the
+        # original (h, w) below is unaffected.
+        scale = self.max_input_edge / max(h, w)
+        if scale < 1:
+            rgb = cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        landmarks = self._detect_landmarks(rgb)
+
+        if landmarks is None:
             self.metrics.confidence_score = max(
                 self.min_confidence, self.metrics.confidence_score - self.score_decay
             )
             return self._build_response(warning="Face not detected")
 
-        face_landmarks = results.multi_face_landmarks[0]
-        h, w, _ = frame.shape
-        points = np.array(
-            [
-                [lm.x * w, lm.y * h, lm.z * w]
-                for lm in face_landmarks.landmark
-            ],
-            dtype=np.float32,
-        )
-
-        ear_left = self._compute_eye_ratio(points, "left")
-        ear_right = self._compute_eye_ratio(points, "right")
-        ear = (ear_left + ear_right) / 2.0
-        self.recent_ear.append(ear)
+        self._fill_landmarks(landmarks)
+        if (h, w) != self._last_hw:
+            self._scale_vec = np.array([[w], [h], [w]], dtype=np.float32)
+            self._last_hw = (h, w)
+        # Scale and transpose into the (3, N) layout in a single ufunc call.
+        coords = np.multiply(self._pts_buf.T, self._scale_vec, out=self._coords)
 
+        (
+            ear,
+            head_pitch,
+            head_yaw,
+            gaze_deviation,
+            smile_ratio,
+            brow_gap,
+            mouth_activity_ratio,
+        ) = map(float, compute_frame_metrics(coords, _PAIR_IDX_A, _PAIR_IDX_B))
+        self._push_ear(ear)
         self._track_blinks(ear)
-        head_pitch, head_yaw = self._estimate_head_pose(points)
-        gaze_deviation = self._estimate_gaze(points)
+        self.metrics.gaze_deviation_score = gaze_deviation
         (
             mood_score,
             mood_label,
             microexpression,
             mouth_activity,
-        ) = self._analyze_expression(points, head_pitch, head_yaw, gaze_deviation)
+        ) = self._analyze_expression(
+            smile_ratio,
+            brow_gap,
+            mouth_activity_ratio,
+            head_pitch,
+            head_yaw,
+            gaze_deviation,
+        )
         self.metrics.mood_score = mood_score
         self.metrics.mood_label = mood_label
         if microexpression:
@@ -140,19 +379,51 @@ class VideoProcessor:
 
         warning = self._update_confidence(head_pitch, head_yaw, gaze_deviation)
 
+        # All values are plain floats here. Non-negative ones are rounded with
+        # int(x * k + 0.5) / k, which is much cheaper than round() in CPython.
         return self._build_response(
-            head_pitch=head_pitch,
-            head_yaw=head_yaw,
-            gaze=gaze_deviation,
-            mood_score=mood_score,
-            mood_label=mood_label,
-            mouth_activity=mouth_activity,
-            warning=warning,
+            warning,
+            {
+                "head_pitch": round(head_pitch, 2),
+                "head_yaw": round(head_yaw, 2),
+                "gaze_deviation": int(gaze_deviation * 1000 + 0.5) / 1000,
+                "mood_score": mood_score,
+                "mood_label": mood_label,
+                "mouth_activity": mouth_activity,
+            },
         )
 
-    def _compute_eye_ratio(self, points: np.ndarray, eye: str) -> float:
-        idx = EYE_LANDMARKS[eye]
-        return _eye_aspect_ratio(points[idx])
+    def _detect_landmarks(self, rgb: np.ndarray):
+        if self.onnx_face_mesh is not None:
+            return self.onnx_face_mesh.process(rgb)
+        results = self.face_mesh.process(rgb)
+        if not results.multi_face_landmarks:
+            return None
+        return results.multi_face_landmarks[0]
+
+    def _fill_landmarks(self, landmarks):
+        # FaceMesh NormalizedLandmarkList, or an (N, 3) array from ONNX Runtime.
+        if isinstance(landmarks, np.ndarray):
+            mesh = self._pts_buf[: len(landmarks)]
+            mesh[:] = landmarks
+        else:
+            mesh = self._pts_buf[: len(landmarks.landmark)]
+            _landmarks_to_array(landmarks, mesh)
+        if len(mesh) < NUM_FACE_LANDMARKS:
+            # No iris points: approximate the centres from the eye contour.
+            for eye in ("left", "right"):
+                self._pts_buf[IRIS_LANDMARKS[eye]] = mesh[EYE_LANDMARKS[eye]].mean(axis=0)
+
+    def _push_ear(self, ear: float):
+        # Keep low_ear_frames in step with the window instead of recounting it.
+        if (
+            len(self.recent_ear) == self.recent_ear.maxlen
+            and self.recent_ear[0] < self.blink_threshold
+        ):
+            self.low_ear_frames -= 1
+        self.recent_ear.append(ear)
+        if ear < self.blink_threshold:
+            self.low_ear_frames += 1
 
     def _track_blinks(self, ear: float):
         if ear < self.blink_threshold:
@@ -162,62 +433,15 @@ class VideoProcessor:
                 self.metrics.blink_count += 1
             self.consecutive_blink_frames = 0
 
-    def _estimate_head_pose(self, points: np.ndarray) -> tuple[float, float]:
-        nose = points[NOSE_TIP]
-        left_ear = points[LEFT_EAR]
-        right_ear = points[RIGHT_EAR]
-
-        ear_vec = right_ear - left_ear
-        yaw = np.degrees(np.arctan2(ear_vec[1], ear_vec[0]))
-
-        nose_to_center = nose - ((left_ear + right_ear) / 2)
-        pitch = np.degrees(np.arctan2(nose_to_center[2], nose_to_center[1]))
-        return pitch, yaw
-
-    def _estimate_gaze(self, points: np.ndarray) -> float:
-        iris_left = points[IRIS_LANDMARKS["left"]]
-        iris_right = points[IRIS_LANDMARKS["right"]]
-        left_eye = points[EYE_LANDMARKS["left"]]
-        right_eye = points[EYE_LANDMARKS["right"]]
-
-        def _gaze_ratio(eye_pts, iris):
-            left_corner = eye_pts[0]
-            right_corner = eye_pts[3]
-            horizontal_range = _euclidean_distance(left_corner, right_corner)
-            dist_left = _euclidean_distance(iris, left_corner)
-            if horizontal_range == 0:
-                return 0.5
-            return dist_left / horizontal_range
-
-        left_ratio = _gaze_ratio(left_eye, iris_left)
-        right_ratio = _gaze_ratio(right_eye, iris_right)
-        deviation = abs(((left_ratio + right_ratio) / 2) - 0.5)
-        self.metrics.gaze_deviation_score = deviation
-        return deviation
-
     def _analyze_expression(
-        self, points: np.ndarray, pitch: float, yaw: float, gaze: float
+        self,
+        smile_ratio: float,
+        brow_gap: float,
+        mouth_activity_ratio: float,
+        pitch: float,
+        yaw: float,
+        gaze: float,
     ) -> tuple[float, str, Optional[str], float]:
-        mouth_left = points[MOUTH_LANDMARKS["left"]]
-        mouth_right = points[MOUTH_LANDMARKS["right"]]
-        mouth_top = points[MOUTH_LANDMARKS["top"]]
-        mouth_bottom = points[MOUTH_LANDMARKS["bottom"]]
-        eye_left = points[BROW_LANDMARKS["eye_left"]]
-        eye_right = points[BROW_LANDMARKS["eye_right"]]
-        brow_left = points[BROW_LANDMARKS["left"]]
-        brow_right = points[BROW_LANDMARKS["right"]]
-
-        mouth_width = _euclidean_distance(mouth_left, mouth_right)
-        mouth_height = _euclidean_distance(mouth_top, mouth_bottom)
-        smile_ratio = mouth_width / max(mouth_height, 1e-6)
-        mouth_activity_ratio = mouth_height / max(mouth_width, 1e-6)
-
-        inter_ocular = _euclidean_distance(eye_left, eye_right)
-        brow_gap = (
-            _euclidean_distance(brow_left, eye_left)
-            + _euclidean_distance(brow_right, eye_right)
-        ) / (2 * max(inter_ocular, 1e-6))
-
         base_mood = 60.0
         mood_score = base_mood + (smile_ratio - 2.5) * 12
         mood_score += (brow_gap - 0.05) * 50
@@ -245,7 +469,12 @@ class VideoProcessor:
         )
 
         self.last_smile_ratio = smile_ratio
-        return round(mood_score, 1), mood_label, microexpression, round(lip_activity_score, 1)
+        return (
+            int(mood_score * 10 + 0.5) / 10,
+            mood_label,
+            microexpression,
+            int(lip_activity_score * 10 + 0.5) / 10,
+        )
 
     def _update_confidence(self, pitch: float, yaw: float, gaze: float) -> Optional[str]:
         warning = None
@@ -253,7 +482,7 @@ class VideoProcessor:
         looking_away = gaze > 0.2
         rapid_blink = (
             len(self.recent_ear) == self.recent_ear.maxlen
-            and sum(ear < self.blink_threshold for ear in self.recent_ear) > 4
+            and self.low_ear_frames > 4
         )
 
         if self.movement_cooldown > 0:
@@ -293,37 +522,18 @@ class VideoProcessor:
         return warning
 
     def _build_response(
-        self,
-        head_pitch: float | None = None,
-        head_yaw: float | None = None,
-        gaze: float | None = None,
-        mood_score: float | None = None,
-        mood_label: Optional[str] = None,
-        mouth_activity: float | None = None,
-        warning: Optional[str] = None,
+        self, warning: Optional[str] = None, frame_metrics: Optional[Dict] = None
     ) -> Dict:
-        warning = warning or self.metrics.last_warning
         payload = {
-            "confidence_score": round(self.metrics.confidence_score, 1),
+            "confidence_score": int(self.metrics.confidence_score * 10 + 0.5) / 10,
             "blink_count": self.metrics.blink_count,
-            "warning": warning,
+            "warning": warning or self.metrics.last_warning,
             "movement_alerts": self.metrics.head_movement_events,
         }
-        if head_pitch is not None:
-            payload["head_pitch"] = round(float(head_pitch), 2)
-        if head_yaw is not None:
-            payload["head_yaw"] = round(float(head_yaw), 2)
-        if gaze is not None:
-            payload["gaze_deviation"] = round(float(gaze), 3)
-        if mood_score is not None:
-            payload["mood_score"] = round(float(mood_score), 1)
-        if mood_label is not None:
-            payload["mood_label"] = mood_label
+        if frame_metrics:
+            payload = {**payload, **frame_metrics}
         if self.metrics.microexpression:
             payload["microexpression"] = self.metrics.microexpression
             if self.microexpression_cooldown < 10:
                 self.metrics.microexpression = None
-        if mouth_activity is not None:
-            payload["mouth_activity"] = mouth_activity
         return payload
-
@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+
+from cv_utils import VideoProcessor
+
+# State owned by each worker process. A session is always routed to the same
+# worker, so its processor (blink/confidence state, FaceMesh tracking) lives
+# here rather than in the web server.
+_processors: Dict[str, VideoProcessor] = {}
+# Processors of ended sessions, reused so their FaceMesh graph is built once.
+_idle_processors: List[VideoProcessor] = []
+
+
+def _processor_for(sid: str) -> VideoProcessor:
+    processor = _processors.get(sid)
+    if processor is None:
+        if _idle_processors:
+            processor = _idle_processors.pop()
+            processor.reset_state()
+        else:
+            processor = VideoProcessor()
+        _processors[sid] = processor
+    return processor
+
+
+def process_frame(sid: str, frame_data: str | bytes) -> Dict:
+    return _processor_for(sid).process_frame(frame_data)
+
+
+def release_session(sid: str) -> None:
+    # Runs on the session's own single-process worker, after any frame of the
+    # session still queued there, so a processor is never made idle (and
+    # handed to another session) while it is mid-frame.
+    processor = _processors.pop(sid, None)
+    if processor is not None:
+        _idle_processors.append(processor)
+
+
+class FrameWorkerPool:
+    """Runs frame processing in worker processes, each session pinned to one worker.
+
+    Each worker is a single-process executor and a session always goes to
+    the one picked by ``hash(sid)``, so several sessions may share a worker.
+    Up to ``workers`` FaceMesh inferences run in parallel without the GIL or
+    the eventlet hub in the way. Executors are started on first use. A
+    worker that dies (segfault, OOM kill) or hangs and is ``recycle``d is
+    replaced; the sessions pinned to it lose their tracking state and start
+    over.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executors: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        # Whether the slot's current worker has finished a frame, i.e. is past
+        # process start-up, imports and the first FaceMesh/JIT warm-up.
+        self._warm: List[bool] = [False] * self.workers
+        # Frames not finished yet, with the slot and executor running them.
+        self._pending: Dict[Future, Tuple[int, ProcessPoolExecutor]] = {}
+        # Sessions that have submitted a frame, i.e. may own a processor.
+        self._sessions: Set[str] = set()
+        # Executor callbacks run on its management thread.
+        self._lock = threading.Lock()
+
+    def _slot(self, sid: str) -> int:
+        return hash(sid) % self.workers
+
+    def _executor(self, slot: int) -> ProcessPoolExecutor:
+        with self._lock:
+            executor = self._executors[slot]
+            if executor is None:
+                # spawn rather than fork: the parent runs eventlet and OS threads.
+                context = multiprocessing.get_context("spawn")
+                executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+                self._executors[slot] = executor
+            return executor
+
+    def _discard(self, slot: int, executor: ProcessPoolExecutor) -> None:
+        # A broken executor has already terminated its workers; only forget it,
+        # unless a replacement was started in the meantime.
+        with self._lock:
+            if self._executors[slot] is executor:
+                self._executors[slot] = None
+                self._warm[slot] = False
+
+    def _on_done(self, future: Future) -> None:
+        slot, executor = self._pending.pop(future)
+        if isinstance(future.exception(), BrokenProcessPool):
+            self._discard(slot, executor)
+        elif self._executors[slot] is executor:
+            self._warm[slot] = True
+
+    def is_warm(self, sid: str) -> bool:
+        return self._warm[self._slot(sid)]
+
+    def submit(self, sid: str, frame_data: str | bytes) -> Future:
+        slot = self._slot(sid)
+        executor = self._executor(slot)
+        try:
+            future = executor.submit(process_frame, sid, frame_data)
+        except BrokenProcessPool:
+            self._discard(slot, executor)
+            executor = self._executor(slot)
+            future = executor.submit(process_frame, sid, frame_data)
+        self._sessions.add(sid)
+        self._pending[future] = slot, executor
+        future.add_done_callback(self._on_done)
+        return future
+
+    def release(self, sid: str) -> None:
+        if sid not in self._sessions:
+            return
+        self._sessions.discard(sid)
+        executor = self._executors[self._slot(sid)]
+        if executor is None:
+            return
+        try:
+            # Queued behind any in-flight frame of the same session.
+            executor.submit(release_session, sid)
+        except BrokenProcessPool:
+            # The worker and its processors are gone; the next submit rebuilds it.
+            pass
+
+    def recycle(self, future: Future) -> None:
+        """Kill the worker running ``future``, e.g. after the frame hung on it.
+
+        The next submit to its slot starts a fresh worker. Frames still queued
+        on the old one fail with ``BrokenProcessPool``.
+        """
+        entry = self._pending.get(future)
+        if entry is None:
+            return  # finished in the meantime
+        slot, executor = entry
+        self._discard(slot, executor)
+        # ProcessPoolExecutor has no public way to stop a running call. SIGKILL
+        # also works on a stopped process; the executor then breaks as after a
+        # crash. Futures are never cancelled: on 3.11 a cancelled pending item
+        # makes the broken-pool cleanup raise InvalidStateError.
+        for process in list((executor._processes or {}).values()):
+            process.kill()
@@ -0,0 +1,227 @@
+import warnings
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+_ROI_SCALE = 1.5  # same margin MediaPipe uses around a face for the landmark crop
+_IRIS_ROI_SCALE = 2.3  # MediaPipe's eye crop: 2.3x the eye-corner distance
+_NUM_MESH_LANDMARKS = 468
+_NUM_IRIS_POINTS = 5
+# (outer corner, inner corner, first iris index in the 478-point layout,
+# mirror crop). The iris model is trained on one eye; MediaPipe mirrors the
+# crop of the other.
+_IRIS_EYES = ((33, 133, 468, False), (362, 263, 473, True))
+
+
+class _BoundModel:
+    """ONNX Runtime session for a square NHWC RGB model, input bound once."""
+
+    def __init__(self, ort, model_path: str, providers: Sequence[str]):
+        self.session = ort.InferenceSession(model_path, providers=list(providers))
+        model_input = self.session.get_inputs()[0]
+        self.size = int(model_input.shape[1])
+        self.num_outputs = len(self.session.get_outputs())
+
+        self._crop = np.empty((self.size, self.size, 3), dtype=np.uint8)
+        self._input = np.empty((1, self.size, self.size, 3), dtype=np.float32)
+        # The input buffer is wrapped (not copied) and bound once, then
+        # rewritten in place every frame.
+        self._input_value = ort.OrtValue.ortvalue_from_numpy(self._input)
+        self._binding = self.session.io_binding()
+        self._binding.bind_ortvalue_input(model_input.name, self._input_value)
+        for output in self.session.get_outputs():
+            self._binding.bind_output(output.name)
+
+    def run(self, rgb: np.ndarray, warp: np.ndarray) -> List[np.ndarray]:
+        cv2.warpAffine(
+            rgb,
+            warp,
+            (self.size, self.size),
+            dst=self._crop,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+        )
+        np.multiply(self._crop, 1 / 255, out=self._input[0], casting="unsafe")
+        self.session.run_with_iobinding(self._binding)
+        return self._binding.copy_outputs_to_cpu()
+
+
+# A worker process runs one frame at a time, so all its sessions share the
+# loaded models and detector: one model load (and CUDA context) per process
+# rather than per session. Only the tracked crop is per session.
+_models: Dict[Tuple[str, Tuple[str, ...]], _BoundModel] = {}
+_detectors: Dict[float, Any] = {}
+
+
+def _bound_model(ort, model_path: str, providers: Sequence[str]) -> _BoundModel:
+    key = (model_path, tuple(providers))
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = _BoundModel(ort, model_path, providers)
+    return model
+
+
+def _face_detector(min_detection_confidence: float):
+    detector = _detectors.get(min_detection_confidence)
+    if detector is None:
+        detector = _detectors[min_detection_confidence] = (
+            mp.solutions.face_detection.FaceDetection(
+                model_selection=0, min_detection_confidence=min_detection_confidence
+            )
+        )
+    return detector
+
+
+class OnnxFaceMesh:
+    """FaceMesh landmark model served by ONNX Runtime instead of MediaPipe.
+
+    ``model_path`` is the public face landmark TFLite model converted with
+    tf2onnx (NHWC 192x192 RGB input in [0, 1]). It must have two outputs:
+    the landmarks in crop pixels, reshaped to ``(N, 3)``, and the
+    face-presence logit, which is what ends tracking when the face is lost.
+
+    The plain mesh model gives N = 468 and has no iris points, which leaves
+    gaze disabled. Pass ``iris_model_path`` (the iris landmark model, NHWC
+    64x64 eye crop in [0, 1]) to add them, giving N = 478. An already fused
+    478-point model needs no iris model.
+
+    MediaPipe's short-range face detector finds the initial crop. After that
+    the crop follows the previous frame's landmarks, as FaceMesh does. Crops
+    are axis-aligned, which suits a roughly upright interview framing.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        iris_model_path: Optional[str] = None,
+        providers: Optional[Sequence[str]] = None,
+        min_detection_confidence: float = 0.5,
+        min_presence: float = 0.5,
+    ):
+        import onnxruntime as ort
+
+        if providers is None:
+            available = ort.get_available_providers()
+            providers = [
+                p
+                for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                if p in available
+            ]
+        self._mesh = _bound_model(ort, model_path, providers)
+        if self._mesh.num_outputs < 2:
+            raise ValueError(
+                f"{model_path}: expected landmark and face-presence outputs, "
+                f"got {self._mesh.num_outputs} output(s)"
+            )
+        self._iris = (
+            _bound_model(ort, iris_model_path, providers) if iris_model_path else None
+        )
+        self.min_presence = min_presence
+        self._warned_no_iris = False
+
+        self._detector = _face_detector(min_detection_confidence)
+        self._roi: Optional[tuple[float, float, float]] = None  # cx, cy, side (px)
+
+    def reset(self):
+        self._roi = None
+
+    def process(self, rgb: np.ndarray) -> Optional[np.ndarray]:
+        """Return normalized ``(N, 3)`` landmarks for the face in ``rgb``, or None."""
+        h, w, _ = rgb.shape
+        if self._roi is None:
+            self._roi = self._detect(rgb)
+            if self._roi is None:
+                return None
+
+        cx, cy, side = self._roi
+        scale = self._mesh.size / side
+        x0, y0 = cx - side / 2, cy - side / 2
+        warp = np.array([[scale, 0, -x0 * scale], [0, scale, -y0 * scale]])
+        outputs = self._mesh.run(rgb, warp)
+        # Output order varies between conversions: the logit is the scalar one.
+        presence_logit = float(min(outputs, key=np.size).reshape(-1)[0])
+        if 1 / (1 + np.exp(-presence_logit)) < self.min_presence:
+            self._roi = None
+            return None
+
+        mesh = max(outputs, key=np.size).reshape(-1, 3)
+        if self._iris is not None and len(mesh) == _NUM_MESH_LANDMARKS:
+            landmarks = np.empty(
+                (_NUM_MESH_LANDMARKS + 2 * _NUM_IRIS_POINTS, 3), dtype=np.float32
+            )
+        else:
+            landmarks = np.empty(mesh.shape, dtype=np.float32)
+        # crop pixels -> image pixels, z scaled like x
+        mesh_px = landmarks[: len(mesh)]
+        np.divide(mesh, scale, out=mesh_px, casting="unsafe")
+        mesh_px[:, 0] += x0
+        mesh_px[:, 1] += y0
+
+        self._roi = self._roi_from_landmarks(mesh_px, w, h)
+        if self._roi is None:
+            # The track has collapsed or run off the frame: not a face any more.
+            return None
+
+        if len(landmarks) > len(mesh):
+            self._add_iris(rgb, landmarks)
+        elif len(landmarks) == _NUM_MESH_LANDMARKS and not self._warned_no_iris:
+            warnings.warn(
+                "ONNX face mesh model has no iris points and no iris model is "
+                "set; gaze_deviation is disabled (see FACE_MESH_ONNX_IRIS_MODEL).",
+                RuntimeWarning,
+            )
+            self._warned_no_iris = True
+
+        landmarks /= np.array([w, h, w], dtype=np.float32)
+        return landmarks
+
+    def _add_iris(self, rgb: np.ndarray, landmarks: np.ndarray) -> None:
+        # Fills rows 468..477 of the pixel-space ``landmarks`` in place.
+        size = self._iris.size
+        for outer, inner, first, mirror in _IRIS_EYES:
+            (ax, ay), (bx, by) = landmarks[outer, :2], landmarks[inner, :2]
+            side = max(float(np.hypot(bx - ax, by - ay)) * _IRIS_ROI_SCALE, 1.0)
+            scale = size / side
+            x0, y0 = (ax + bx - side) / 2, (ay + by - side) / 2
+            if mirror:
+                warp = np.array(
+                    [[-scale, 0, size + x0 * scale], [0, scale, -y0 * scale]]
+                )
+            else:
+                warp = np.array([[scale, 0, -x0 * scale], [0, scale, -y0 * scale]])
+            iris = min(self._iris.run(rgb, warp), key=np.size).reshape(-1, 3)
+            iris = iris[:_NUM_IRIS_POINTS] / scale
+            if mirror:
+                iris[:, 0] = size / scale - iris[:, 0]
+            iris[:, 0] += x0
+            iris[:, 1] += y0
+            landmarks[first : first + _NUM_IRIS_POINTS] = iris
+
+    def _detect(self, rgb: np.ndarray) -> Optional[tuple[float, float, float]]:
+        results = self._detector.process(rgb)
+        if not results.detections:
+            return None
+        h, w, _ = rgb.shape
+        box = results.detections[0].location_data.relative_bounding_box
+        cx = (box.xmin + box.width / 2) * w
+        cy = (box.ymin + box.height / 2) * h
+        side = max(box.width * w, box.height * h) * _ROI_SCALE
+        return (cx, cy, side) if side >= 1 else None
+
+    @staticmethod
+    def _roi_from_landmarks(
+        landmarks_px: np.ndarray, w: int, h: int
+    ) -> Optional[tuple[float, float, float]]:
+        xs = landmarks_px[:, 0]
+        ys = landmarks_px[:, 1]
+        x_min, x_max = float(xs.min()), float(xs.max())
+        y_min, y_max = float(ys.min()), float(ys.max())
+        side = max(x_max - x_min, y_max - y_min) * _ROI_SCALE
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        # A sane track is a few pixels or more across, no larger than the
+        # frame, and centred inside it.
+        if not (1 <= side <= 2 * max(w, h)) or not (0 <= cx < w and 0 <= cy < h):
+            return None
+        return cx, cy, side
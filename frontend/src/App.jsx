@@ -141,9 +141,15 @@ export default function App() {
     const interval = setInterval(() => {
       const webcam = webcamRef.current;
       if (!webcam) return;
-      const imageSrc = webcam.getScreenshot();
-      if (!imageSrc) return;
-      socket.emit("video_frame", { image: imageSrc });
+      const canvas = webcam.getCanvas();
+      if (!canvas) return;
+      canvas.toBlob(
+        (blob) => {
+          if (blob) socket.emit("video_frame", blob);
+        },
+        "image/jpeg",
+        0.92
+      );
     }, 100);
     return () => clearInterval(interval);
   }, [sessionActive]);